@@ -1,35 +1,279 @@
+import atexit
+import gc
+import hashlib
+import io
+import os
+import tempfile
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
 
-def validate_csv(df, column_lists):
+# Uploads larger than this are rejected before parsing
+MAX_UPLOAD_MB = 50
+
+# Valid column configurations of the OJS reports, mapped to the language
+# of the export
+ARTICLES_SCHEMAS = {
+    ('ID', 'Title', 'Total', 'Abstract Views', 'File Views', 'PDF', 'HTML', 'Other'): 'English',
+    ('ID', 'Titel', 'Total', 'Samenvatting bekeken', 'File Views', 'PDF', 'HTML', 'Overig'): 'Dutch'
+}
+
+GEO_SCHEMAS = {
+    ('City', 'Region', 'Country', 'Total', 'Unique'): 'English',
+    ('Stad', 'Regio', 'Land', 'Total', 'Unique'): 'Dutch'
+}
+
+# Columns of the geographic report the Visitor Statistics page uses, the
+# City and Region columns are not parsed at all
+GEO_COLUMNS = ['Country', 'Total', 'Unique']
+
+def read_header(raw):
     """
-    Validate CSV against multiple possible column configurations
-    column_lists should be a list of lists, where each inner list represents
-    a valid column configuration
+    Read only the header row of an uploaded OJS report
     """
-    actual_columns = list(df.columns)
-    
-    for valid_columns in column_lists:
-        if actual_columns == valid_columns:
-            return True
-    return False
+    return list(pd.read_csv(io.BytesIO(raw), skiprows=4, nrows=0).columns)
+
+def validate_csv(columns, schemas):
+    """
+    Validate the columns of a CSV against the valid column configurations
+    Returns the language of the matching configuration, or None
+    """
+    return schemas.get(tuple(columns))
+
+def english_columns(schemas):
+    """
+    Return the English column configuration of a report
+    """
+    return next(columns for columns, language in schemas.items() if language == 'English')
 
 def generate_temporal_span(csv_file):
     ...
 
+# Column types of the OJS reports (English and Dutch headers), so they do
+# not have to be inferred while parsing. The view and visitor counts
+# fit comfortably in 32 bits, which halves the memory they take up; a
+# report with larger values is read again with type inference.
+ARTICLES_DTYPES = {
+    'ID': 'int64',
+    'Title': 'string',
+    'Titel': 'string',
+    'Total': 'int32',
+    'Abstract Views': 'int32',
+    'Samenvatting bekeken': 'int32',
+    'File Views': 'int32',
+    'PDF': 'int32',
+    'HTML': 'int32',
+    'Other': 'int32',
+    'Overig': 'int32'
+}
+
+# Only the GEO_COLUMNS are parsed; Country repeats a lot, so each chunk
+# holds it as a categorical while it is summed
+GEO_DTYPES = {
+    'Country': 'category',
+    'Land': 'category',
+    'Total': 'int32',
+    'Unique': 'int32'
+}
+
+# The same column types for pyarrow's CSV reader
+ARROW_TYPES = {
+    'int32': pa.int32(),
+    'int64': pa.int64(),
+    'string': pa.string(),
+    'category': pa.dictionary(pa.int32(), pa.string())
+}
+
+def _read_csv(csv_file, dtypes=None):
+    """
+    Parse an OJS report with pyarrow's multithreaded CSV reader.
+    The first four lines of an export (title, journal, date range and a
+    blank line) are skipped, the fifth holds the column names.
+    """
+    table = pv.read_csv(
+        csv_file,
+        read_options=pv.ReadOptions(skip_rows=4),
+        convert_options=_convert_options(dtypes)
+    )
+    return table.to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get)
+
+def _convert_options(dtypes):
+    """
+    Return pyarrow's conversion options for the given pandas column types
+    """
+    column_types = {column: ARROW_TYPES[dtype] for column, dtype in (dtypes or {}).items()}
+    # empty cells are missing values, as with pandas, not empty strings
+    return pv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+
+def _iter_csv_chunks(csv_file, dtypes=None, usecols=None):
+    """
+    Parse an OJS report one chunk of rows at a time, like _read_csv
+    Only the columns in usecols are parsed, all of them if it is None
+    """
+    convert_options = _convert_options(dtypes)
+    if usecols is not None:
+        convert_options.include_columns = usecols
+    reader = pv.open_csv(
+        csv_file,
+        read_options=pv.ReadOptions(skip_rows=4),
+        convert_options=convert_options
+    )
+    for batch in reader:
+        yield batch.to_pandas(types_mapper={pa.string(): pd.StringDtype()}.get)
+
+def _sum_by_country(chunks, names):
+    """
+    Sum Total and Unique per country over chunks of a geographic report,
+    whose columns are renamed to English with names
+    Every chunk is reduced to its per-country sums before the next one is
+    parsed. Rows without a country are kept as their own group, so they
+    still count towards the total number of visitors.
+    """
+    parts = []
+    for chunk in chunks:
+        chunk = chunk.rename(columns=names)
+        # int32 counts are widened so their sums cannot overflow; the inferred
+        # types of the fallback read (float when a count is blank) are kept
+        widen = {column: 'int64' for column in ('Total', 'Unique') if chunk[column].dtype == 'int32'}
+        parts.append(
+            chunk.astype(widen)
+            .groupby('Country', observed=True, sort=False, dropna=False)[['Total', 'Unique']]
+            .sum()
+            .reset_index()
+        )
+    if not parts:
+        return pd.DataFrame({'Country': pd.Categorical([]), 'Total': [], 'Unique': []}).astype({'Total': 'int64', 'Unique': 'int64'})
+    # the chunks have their own categories, so the partial sums are combined by name
+    totals = pd.concat(parts, ignore_index=True).astype({'Country': 'string'})
+    totals = totals.groupby('Country', sort=False, dropna=False)[['Total', 'Unique']].sum().reset_index()
+    return totals.astype({'Country': 'category'})
+
+def aggregate_geo_csv(raw, dtypes):
+    """
+    Read the bytes of a geographic report as per-country visitor sums,
+    streaming it so the full report is never in memory at once.
+    If the values do not match the known column types, the file is read
+    again with type inference.
+    """
+    # The pages use the English column names, whatever the export language
+    names = dict(zip(read_header(raw), english_columns(GEO_SCHEMAS)))
+    usecols = [column for column, name in names.items() if name in GEO_COLUMNS]
+    try:
+        return _sum_by_country(_iter_csv_chunks(io.BytesIO(raw), dtypes, usecols), names)
+    except (ValueError, TypeError):
+        # the failed read stopped part way through its buffer, so the second
+        # attempt reads from a new one
+        return _sum_by_country(_iter_csv_chunks(io.BytesIO(raw), usecols=usecols), names)
+
+def read_ojs_csv(csv_file, dtypes):
+    """
+    Read an OJS report using the known column types.
+    If the values do not match those types, the file is read again with
+    type inference.
+    """
+    try:
+        return _read_csv(csv_file, dtypes)
+    except (ValueError, TypeError):
+        csv_file.seek(0)
+        return _read_csv(csv_file)
+
+def parquet_path(raw, kind):
+    """
+    Return the path of the Parquet copy of an uploaded report
+    The file name is derived from a hash of the contents, so the same upload
+    always maps to the same file
+    """
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"ojs-stats-{kind}-{digest}.parquet")
+
+def remove_file(path):
+    """
+    Remove a file if it still exists
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+def write_parquet(df, path):
+    """
+    Write a parsed report to a Parquet file at path
+    The file is written under a temporary name and then moved into place, so
+    other sessions never read a half-written file
+    """
+    with tempfile.NamedTemporaryFile(suffix='.parquet', dir=os.path.dirname(path), delete=False) as parquet_file:
+        df.to_parquet(parquet_file, index=False, compression='zstd')
+    os.replace(parquet_file.name, path)
+
+def store_report(raw, kind, parse):
+    """
+    Parse the bytes of an uploaded report with parse and store the result as
+    Parquet, returning the file path that the other pages read it from.
+    If the Parquet file of this upload already exists it is reused as is.
+    The file is removed when the app shuts down.
+    """
+    path = parquet_path(raw, kind)
+    atexit.register(remove_file, path)
+    if os.path.exists(path):
+        return path
+
+    df = parse(raw)
+    write_parquet(df, path)
+    # the parsed frame is not kept in memory, only the Parquet file
+    del df
+    gc.collect()
+    return path
+
+def parse_articles(raw):
+    """
+    Parse an article report with all of its columns, which the Views and
+    Downloads page shows for the top 5 articles
+    """
+    df = read_ojs_csv(io.BytesIO(raw), ARTICLES_DTYPES)
+    # The pages use the English column names, whatever the export language
+    return df.rename(columns=dict(zip(df.columns, english_columns(ARTICLES_SCHEMAS))))
+
+def parse_geo(raw):
+    """
+    Parse a geographic report into its visitor sums per country, which is
+    all the Visitor Statistics page uses
+    """
+    return aggregate_geo_csv(raw, GEO_DTYPES)
+
+# Both loaders are cached on the file contents, so reruns with the same
+# upload skip parsing
+@st.cache_data(show_spinner=False)
+def load_articles(raw):
+    """
+    Store an uploaded article report, returning the path of its Parquet file
+    """
+    return store_report(raw, 'articles', parse_articles)
+
+@st.cache_data(show_spinner=False)
+def load_geo(raw):
+    """
+    Store an uploaded geographic report, returning the path of its Parquet file
+    """
+    return store_report(raw, 'geo', parse_geo)
+
 # initialize a session state for the dataframe if it does not exist yet
-if 'df' not in st.session_state:
-    st.session_state.df = None
+if 'df_path' not in st.session_state:
+    st.session_state.df_path = None
 
 if 'df_valid' not in st.session_state:
     st.session_state.df_valid = False
 
-if 'geodf' not in st.session_state:
-    st.session_state.geodf = None
+if 'df_lang' not in st.session_state:
+    st.session_state.df_lang = None
+
+if 'geodf_path' not in st.session_state:
+    st.session_state.geodf_path = None
 
 if 'geodf_valid' not in st.session_state:
     st.session_state.geodf_valid = False
 
+if 'geodf_lang' not in st.session_state:
+    st.session_state.geodf_lang = None
+
 st.title('OpenJournals Statistics')
 
 st.markdown("""
@@ -52,30 +296,29 @@ if csv_file is not None:
     # Check if the uploaded file is a CSV
     if not csv_file.name.lower().endswith('.csv'):
         st.error("❌ Please upload a CSV file (.csv extension required)")
+    elif csv_file.size > MAX_UPLOAD_MB * 1024 * 1024:
+        st.error(f"❌ File too large ({csv_file.size / (1024 * 1024):.1f} MB, the limit is {MAX_UPLOAD_MB} MB). "
+                 "Please export a report for a shorter date range.")
     else:
         try:
-            # Cache the uploaded file so all pages can access it
-            st.session_state.df = pd.read_csv(csv_file, skiprows=4)
+            raw = csv_file.getvalue()
+            # Check the header before parsing the whole file
+            columns = read_header(raw)
             
             try:
-                # Define valid column configurations for articles (English and Dutch)
-                articles_column_configs = [
-                    ['ID', 'Title', 'Total', 'Abstract Views', 'File Views', 'PDF', 'HTML', 'Other'],  # English
-                    ['ID', 'Titel', 'Total', 'Samenvatting bekeken', 'File Views', 'PDF', 'HTML', 'Overig']  # Dutch
-                ]
-                
-                if validate_csv(st.session_state.df, articles_column_configs):
+                language = validate_csv(columns, ARTICLES_SCHEMAS)
+                if language:
+                    # Cache the uploaded file so all pages can access it
+                    st.session_state.df_path = load_articles(raw)
                     st.session_state.df_valid = True
-                    st.session_state.df = st.session_state.df.rename(
-                        columns={st.session_state.df.columns[2]: "Abstract Views"}
-                    )
+                    st.session_state.df_lang = language
                     st.success("✅ Article Data uploaded and cached successfully!")
                 else:
                     st.warning("The CSV you uploaded does not appear to be an OJS Article Report.")
                     with st.expander("Show detected columns"):
-                        st.write("Detected columns:", list(st.session_state.df.columns))
-                        st.write("Expected columns (English):", articles_column_configs[0])
-                        st.write("Expected columns (Dutch):", articles_column_configs[1])
+                        st.write("Detected columns:", columns)
+                        for valid_columns, language in ARTICLES_SCHEMAS.items():
+                            st.write(f"Expected columns ({language}):", list(valid_columns))
             except Exception as validation_error:
                 st.warning("The CSV you uploaded does not appear to be an OJS Article Report.")
                 # Optionally show the technical error for debugging
@@ -91,34 +334,30 @@ if csv_file_geo is not None:
     #check if the uploaded file is a CSV
     if not csv_file_geo.name.lower().endswith('.csv'):
         st.error("❌ Please upload a CSV file (.csv extension required)")
+    elif csv_file_geo.size > MAX_UPLOAD_MB * 1024 * 1024:
+        st.error(f"❌ File too large ({csv_file_geo.size / (1024 * 1024):.1f} MB, the limit is {MAX_UPLOAD_MB} MB). "
+                 "Please export a report for a shorter date range.")
     else:
         try:
-            #cache the uploaded file so all pages can access it
-            st.session_state.geodf = pd.read_csv(csv_file_geo, skiprows=4)
+            raw = csv_file_geo.getvalue()
+            #check the header before parsing the whole file
+            columns = read_header(raw)
             
             try:
-                # Define valid column configurations for geographic data (English and Dutch)
-                geo_column_configs = [
-                    ['City', 'Region', 'Country', 'Total', 'Unique'],  # English
-                    ['Stad', 'Regio', 'Land', 'Total', 'Unique']  # Dutch
-                ]
-                
-                if validate_csv(st.session_state.geodf, geo_column_configs):
+                language = validate_csv(columns, GEO_SCHEMAS)
+                if language:
+                    #cache the uploaded file so all pages can access it
+                    st.session_state.geodf_path = load_geo(raw)
                     st.session_state.geodf_valid = True
-
-                    st.session_state.geodf = st.session_state.geodf.rename(
-                        columns={st.session_state.geodf.columns[0]: "City",
-                                 st.session_state.geodf.columns[1]: "Region",
-                                 st.session_state.geodf.columns[2]: "Country"}
-                    )
+                    st.session_state.geodf_lang = language
 
                     st.success("✅ Geographical Data uploaded and cached successfully!")
                 else:
                     st.warning("The CSV you uploaded does not appear to be an OJS Geographic Report.")
                     with st.expander("Show detected columns"):
-                        st.write("Detected columns:", list(st.session_state.geodf.columns))
-                        st.write("Expected columns (English):", geo_column_configs[0])
-                        st.write("Expected columns (Dutch):", geo_column_configs[1])
+                        st.write("Detected columns:", columns)
+                        for valid_columns, language in GEO_SCHEMAS.items():
+                            st.write(f"Expected columns ({language}):", list(valid_columns))
             except Exception as validation_error:
                 st.warning('The CSV you uploaded does not appear to be a valid OJS Geographic Report.')
                 with st.expander("Technical details (for debugging)"):
@@ -6,10 +6,25 @@ This script fetches all articles from a journal and their citation counts using
 
 import requests
 import time
+import heapq
 import csv
+import functools
+import io
 import json
+import sqlite3
+import sys
+import numpy as np
+import pandas as pd
 from typing import List, Dict, Optional
 from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, the standard library json module is used without it
+    orjson = None
 
 # Configuration
 JOURNAL_ISSN = "0167-9228"  # Replace with your journal's ISSN
@@ -21,13 +36,66 @@ BASE_URL = "https://api.crossref.org/works"
 HEADERS = {
     "User-Agent": f"{APP_NAME} (mailto:{YOUR_EMAIL})"
 }
+# Minimum number of seconds between the start of two requests
+REQUEST_INTERVAL = 1.0
+REQUEST_TIMEOUT = 30
+
+# A shared session keeps the connection to CrossRef alive between pages and
+# retries rate-limited or failed requests with a backoff
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Fetched pages are cached on disk, so repeated runs for the same journal
+# do not have to query the API again
+CACHE_FILE = ".crossref_cache.sqlite"
+CACHE_TTL = 7 * 24 * 60 * 60  # 7 days, in seconds
+
+# Upper bounds of the citation ranges in the report (the last range is 51+)
+CITATION_RANGE_BOUNDS = np.array([0, 5, 10, 20, 50])
+
+def open_cache(path: str = CACHE_FILE) -> sqlite3.Connection:
+    """Open the page cache, creating its table if needed."""
+    cache = sqlite3.connect(path)
+    cache.execute("CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, content BLOB, expires REAL)")
+    return cache
 
-def fetch_all_articles(issn: str) -> List[Dict]:
+def get_cached_page(cache: sqlite3.Connection, key: str) -> Optional[bytes]:
+    """Return the cached response body for a page, or None if missing or expired."""
+    row = cache.execute(
+        "SELECT content FROM pages WHERE key = ? AND expires > ?", (key, time.time())
+    ).fetchone()
+    return row[0] if row else None
+
+def store_cached_pages(cache: sqlite3.Connection, pages: Dict[str, bytes], ttl: int = CACHE_TTL):
+    """Store response bodies by page key, all with the same expiry time.
+
+    Expired pages are deleted in the same transaction: every crawl after
+    expiry stores a new chain of cursor keys, so they would pile up otherwise.
+    """
+    now = time.time()
+    expires = now + ttl
+    with cache:
+        cache.execute("DELETE FROM pages WHERE expires <= ?", (now,))
+        cache.executemany(
+            "INSERT OR REPLACE INTO pages (key, content, expires) VALUES (?, ?, ?)",
+            [(key, content, expires) for key, content in pages.items()]
+        )
+
+def fetch_all_articles(issn: str, verbose: bool = True) -> List[Dict]:
     """
     Fetch all articles from a journal by ISSN and return their citation data.
     
+    Pages are read from the on-disk cache when a complete crawl of the
+    journal was cached within CACHE_TTL, and fetched from the API otherwise.
+    
     Args:
         issn: The ISSN of the journal
+        verbose: Print progress for every page
         
     Returns:
         List of dictionaries containing article data
@@ -36,30 +104,66 @@ def fetch_all_articles(issn: str) -> List[Dict]:
     cursor = "*"
     has_more = True
     page_count = 0
+    last_request = 0.0
+    cache = open_cache()
+    use_cache = True
+    fetched_pages = {}
+    failed = False
     
-    print(f"Starting to fetch articles for ISSN: {issn}")
+    if verbose:
+        print(f"Starting to fetch articles for ISSN: {issn}")
     
     while has_more:
         try:
             page_count += 1
-            print(f"Fetching page {page_count}...")
+            key = f"{issn}:{cursor}"
+            content = get_cached_page(cache, key) if use_cache else None
             
-            # Build parameters
-            params = {
-                "filter": f"issn:{issn}",
-                "rows": "1000",
-                "cursor": cursor,
-                "select": "DOI,title,is-referenced-by-count,published-print,published-online"
-            }
+            if content is None and use_cache and cursor != "*":
+                # Cursors expire, so a partly cached crawl cannot be continued
+                # from the API: start over without the cache
+                if verbose:
+                    print("Cached pages are incomplete, fetching all pages again...")
+                all_articles = []
+                cursor = "*"
+                page_count = 0
+                use_cache = False
+                continue
             
-            # Make the API request
-            response = requests.get(BASE_URL, headers=HEADERS, params=params)
-            response.raise_for_status()
+            if content is not None:
+                if verbose:
+                    print(f"Reading page {page_count} from cache...")
+            else:
+                use_cache = False
+                if verbose:
+                    print(f"Fetching page {page_count}...")
+                
+                # Build parameters
+                params = {
+                    "filter": f"issn:{issn}",
+                    "rows": "1000",
+                    "cursor": cursor,
+                    "select": "DOI,title,is-referenced-by-count,published-print,published-online"
+                }
+                
+                # Be respectful to the API: the time spent processing the previous
+                # page counts towards the delay between requests
+                delay = REQUEST_INTERVAL - (time.monotonic() - last_request)
+                if delay > 0:
+                    time.sleep(delay)
+                
+                # Make the API request
+                last_request = time.monotonic()
+                response = SESSION.get(BASE_URL, params=params, timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                content = response.content
+                fetched_pages[key] = content
             
-            data = response.json()
+            data = orjson.loads(content) if orjson else json.loads(content)
             items = data.get("message", {}).get("items", [])
             
-            print(f"Found {len(items)} articles on this page")
+            if verbose:
+                print(f"Found {len(items)} articles on this page")
             
             # Process each article
             for article in items:
@@ -74,17 +178,20 @@ def fetch_all_articles(issn: str) -> List[Dict]:
             # Check if there are more pages
             cursor = data.get("message", {}).get("next-cursor")
             has_more = cursor and len(items) > 0
-            
-            # Add delay between requests to be respectful to the API
-            if has_more:
-                time.sleep(1)  # 1 second delay
                 
         except requests.exceptions.RequestException as e:
             print(f"Error fetching page {page_count}: {e}")
             has_more = False
+            failed = True
         except Exception as e:
             print(f"Unexpected error on page {page_count}: {e}")
             has_more = False
+            failed = True
+    
+    # Only cache complete crawls, so the cached cursor chain has no gaps
+    if fetched_pages and not failed:
+        store_cached_pages(cache, fetched_pages)
+    cache.close()
     
     return all_articles
 
@@ -117,84 +224,68 @@ def generate_report(articles: List[Dict]) -> Dict:
     Returns:
         Dictionary containing report statistics
     """
-    print("\n" + "=" * 60)
-    print("JOURNAL CITATION REPORT")
-    print("=" * 60)
+    # Collect the report in a buffer and write it to stdout in one go
+    report = io.StringIO()
+    out = functools.partial(print, file=report)
+    
+    out("\n" + "=" * 60)
+    out("JOURNAL CITATION REPORT")
+    out("=" * 60)
     
     # Basic statistics
     total_articles = len(articles)
     total_citations = sum(article["citation_count"] for article in articles)
     avg_citations = total_citations / total_articles if total_articles > 0 else 0
     
-    print(f"Journal ISSN: {JOURNAL_ISSN}")
-    print(f"Total Articles: {total_articles}")
-    print(f"Total Citations: {total_citations}")
-    print(f"Average Citations per Article: {avg_citations:.2f}")
+    out(f"Journal ISSN: {JOURNAL_ISSN}")
+    out(f"Total Articles: {total_articles}")
+    out(f"Total Citations: {total_citations}")
+    out(f"Average Citations per Article: {avg_citations:.2f}")
     
     # Top 10 most cited articles
-    top_cited = sorted(articles, key=lambda x: x["citation_count"], reverse=True)[:10]
+    top_cited = heapq.nlargest(10, articles, key=lambda x: x["citation_count"])
     
-    print(f"\nTOP 10 MOST CITED ARTICLES:")
-    print("-" * 60)
+    out(f"\nTOP 10 MOST CITED ARTICLES:")
+    out("-" * 60)
     for i, article in enumerate(top_cited, 1):
         title = article["title"]
         if len(title) > 50:
             title = title[:50] + "..."
         
-        print(f"{i}. [{article['citation_count']} citations] {title}")
-        print(f"   DOI: {article['doi']}")
+        out(f"{i}. [{article['citation_count']} citations] {title}")
+        out(f"   DOI: {article['doi']}")
         if article["published_year"]:
-            print(f"   Year: {article['published_year']}")
-        print()
+            out(f"   Year: {article['published_year']}")
+        out()
     
     # Citation distribution
-    citation_ranges = {
-        "0 citations": 0,
-        "1-5 citations": 0,
-        "6-10 citations": 0,
-        "11-20 citations": 0,
-        "21-50 citations": 0,
-        "51+ citations": 0
-    }
+    # Bucket the citation counts; each range includes its upper bound
+    range_names = ["0 citations", "1-5 citations", "6-10 citations",
+                   "11-20 citations", "21-50 citations", "51+ citations"]
+    counts = np.fromiter((article["citation_count"] for article in articles),
+                         dtype=np.int64, count=total_articles)
+    buckets = np.searchsorted(CITATION_RANGE_BOUNDS, counts, side="left")
+    citation_ranges = dict(zip(range_names, np.bincount(buckets, minlength=len(range_names)).tolist()))
     
-    for article in articles:
-        count = article["citation_count"]
-        if count == 0:
-            citation_ranges["0 citations"] += 1
-        elif count <= 5:
-            citation_ranges["1-5 citations"] += 1
-        elif count <= 10:
-            citation_ranges["6-10 citations"] += 1
-        elif count <= 20:
-            citation_ranges["11-20 citations"] += 1
-        elif count <= 50:
-            citation_ranges["21-50 citations"] += 1
-        else:
-            citation_ranges["51+ citations"] += 1
-    
-    print("CITATION DISTRIBUTION:")
-    print("-" * 30)
+    out("CITATION DISTRIBUTION:")
+    out("-" * 30)
     for range_name, count in citation_ranges.items():
         percentage = (count / total_articles) * 100 if total_articles > 0 else 0
-        print(f"{range_name}: {count} articles ({percentage:.1f}%)")
+        out(f"{range_name}: {count} articles ({percentage:.1f}%)")
     
     # Year-based analysis if we have publication years
     articles_with_years = [a for a in articles if a["published_year"]]
     if articles_with_years:
-        print(f"\nYEAR-BASED ANALYSIS:")
-        print("-" * 30)
-        year_stats = {}
-        for article in articles_with_years:
-            year = article["published_year"]
-            if year not in year_stats:
-                year_stats[year] = {"count": 0, "total_citations": 0}
-            year_stats[year]["count"] += 1
-            year_stats[year]["total_citations"] += article["citation_count"]
+        out(f"\nYEAR-BASED ANALYSIS:")
+        out("-" * 30)
+        year_stats = (pd.DataFrame(articles_with_years)
+                      .groupby("published_year")["citation_count"]
+                      .agg(["count", "sum", "mean"]))
         
-        for year in sorted(year_stats.keys()):
-            stats = year_stats[year]
-            avg_cites = stats["total_citations"] / stats["count"]
-            print(f"{year}: {stats['count']} articles, {stats['total_citations']} total citations, {avg_cites:.1f} avg")
+        for year, count, total_cites, avg_cites in year_stats.itertuples():
+            out(f"{year}: {count} articles, {total_cites} total citations, {avg_cites:.1f} avg")
+    
+    sys.stdout.write(report.getvalue())
     
     return {
         "total_articles": total_articles,
@@ -220,28 +311,25 @@ def export_to_csv(articles: List[Dict], filename: str = None) -> str:
         filename = f"journal-citations-{JOURNAL_ISSN.replace('-', '')}.csv"
     
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['DOI', 'Title', 'Citations', 'Year']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer = csv.writer(csvfile)
         
-        writer.writeheader()
-        for article in articles:
-            writer.writerow({
-                'DOI': article['doi'],
-                'Title': article['title'],
-                'Citations': article['citation_count'],
-                'Year': article['published_year'] or 'Unknown'
-            })
+        writer.writerow(['DOI', 'Title', 'Citations', 'Year'])
+        writer.writerows(
+            (article['doi'], article['title'], article['citation_count'], article['published_year'] or 'Unknown')
+            for article in articles
+        )
     
     print(f"\nData exported to: {filename}")
     return filename
 
-def export_to_json(articles: List[Dict], filename: str = None) -> str:
+def export_to_json(articles: List[Dict], filename: str = None, pretty: bool = False) -> str:
     """
     Export article data to JSON file.
     
     Args:
         articles: List of article dictionaries
         filename: Optional filename, defaults to journal-citations-{issn}.json
+        pretty: Indent the output for reading; compact output is smaller and faster to write
         
     Returns:
         The filename that was created
@@ -249,8 +337,15 @@ def export_to_json(articles: List[Dict], filename: str = None) -> str:
     if filename is None:
         filename = f"journal-citations-{JOURNAL_ISSN.replace('-', '')}.json"
     
-    with open(filename, 'w', encoding='utf-8') as jsonfile:
-        json.dump(articles, jsonfile, indent=2, ensure_ascii=False)
+    if orjson:
+        with open(filename, 'wb') as jsonfile:
+            jsonfile.write(orjson.dumps(articles, option=orjson.OPT_INDENT_2 if pretty else None))
+    else:
+        with open(filename, 'w', encoding='utf-8') as jsonfile:
+            if pretty:
+                json.dump(articles, jsonfile, indent=2, ensure_ascii=False)
+            else:
+                json.dump(articles, jsonfile, separators=(',', ':'), ensure_ascii=False)
     
     print(f"Data exported to: {filename}")
     return filename
@@ -8,11 +8,28 @@ import requests
 import time
 import csv
 import json
+import math
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
 from io import StringIO, BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, responses are decoded with the standard library without it
+    orjson = None
+
+try:
+    import requests_cache
+except ImportError:
+    # requests-cache is optional, responses are only cached in memory without it
+    requests_cache = None
 
 # Page configuration
 st.set_page_config(
@@ -23,63 +40,61 @@ st.set_page_config(
 
 # API Configuration
 BASE_URL = "https://api.crossref.org/works"
+ROWS_PER_PAGE = 1000
+MAX_OFFSET = 10000  # CrossRef refuses deeper offsets; larger journals are paged with cursors
+MAX_WORKERS = 10
+# Offset pages are requested in parallel, so they need a fixed order; works added during a
+# crawl are created last and cannot shift the earlier windows
+OFFSET_SORT = {"sort": "created", "order": "asc"}
+SELECT_FIELDS = "DOI,title,is-referenced-by-count,published-print,published-online"
+HTTP_CACHE_NAME = "crossref_cache"  # sqlite file for CrossRef responses, if requests-cache is installed
+HTTP_CACHE_EXPIRE = 86400
+PROGRESS_INTERVAL = 0.1  # minimum seconds between progress bar redraws
+TABLE_PAGE_SIZE = 100  # rows sent to the browser per page of the articles table
+
+# Citation distribution buckets: the edges are half-open [lo, hi), the last bin is open-ended
+CITATION_BINS = [0, 1, 6, 11, 21, 51, np.inf]
+CITATION_LABELS = ["0", "1-5", "6-10", "11-20", "21-50", "51+"]
 
 def get_headers(email: str, app_name: str = "JournalCitationCounter/1.0") -> dict:
     """Generate headers for API requests."""
     return {"User-Agent": f"{app_name} (mailto:{email})"}
 
-def fetch_all_articles(issn: str, email: str, progress_bar, status_text) -> List[Dict]:
-    """Fetch all articles from a journal by ISSN."""
-    all_articles = []
-    cursor = "*"
-    has_more = True
-    page_count = 0
-    
-    headers = get_headers(email)
-    
-    while has_more:
-        try:
-            page_count += 1
-            status_text.text(f"Fetching page {page_count}...")
-            
-            params = {
-                "filter": f"issn:{issn}",
-                "rows": "1000",
-                "cursor": cursor,
-                "select": "DOI,title,is-referenced-by-count,published-print,published-online"
-            }
-            
-            response = requests.get(BASE_URL, headers=headers, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            items = data.get("message", {}).get("items", [])
-            
-            for article in items:
-                processed_article = {
-                    "doi": article.get("DOI", ""),
-                    "title": get_title(article),
-                    "citation_count": article.get("is-referenced-by-count", 0),
-                    "published_year": get_published_year(article)
-                }
-                all_articles.append(processed_article)
-            
-            cursor = data.get("message", {}).get("next-cursor")
-            has_more = cursor and len(items) > 0
-            
-            progress_bar.progress(min(page_count / 10, 1.0))
-            
-            if has_more:
-                time.sleep(1)
-                
-        except requests.exceptions.RequestException as e:
-            st.error(f"Error fetching page {page_count}: {e}")
-            has_more = False
-        except Exception as e:
-            st.error(f"Unexpected error on page {page_count}: {e}")
-            has_more = False
-    
-    return all_articles
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Shared HTTP session, so connections to CrossRef stay open across pages and reruns.
+
+    Rate limiting (429) and server errors are retried with exponential backoff.
+    With requests-cache installed, responses are also kept in an sqlite cache
+    for a day, so they survive app restarts.
+    """
+    if requests_cache:
+        session = requests_cache.CachedSession(
+            HTTP_CACHE_NAME,
+            backend="sqlite",
+            expire_after=HTTP_CACHE_EXPIRE,
+            allowable_methods=["GET"]
+        )
+    else:
+        session = requests.Session()
+    retries = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(
+        pool_connections=MAX_WORKERS,
+        pool_maxsize=MAX_WORKERS,
+        max_retries=retries
+    ))
+    return session
+
+def get_works(params: dict, headers: dict, force_refresh: bool = False) -> Dict:
+    """Request one page of works, bypassing the HTTP cache if ``force_refresh`` is set."""
+    session = get_session()
+    if force_refresh and requests_cache:
+        response = session.get(BASE_URL, headers=headers, params=params, force_refresh=True)
+    else:
+        response = session.get(BASE_URL, headers=headers, params=params)
+    response.raise_for_status()
+    data = orjson.loads(response.content) if orjson else response.json()
+    return data.get("message", {})
 
 def get_title(article: Dict) -> str:
     """Extract title from article data."""
@@ -99,36 +114,166 @@ def get_published_year(article: Dict) -> Optional[int]:
             return date_parts[0][0]
     return None
 
-def create_citation_distribution_chart(articles: List[Dict]) -> go.Figure:
-    """Create a bar chart for citation distribution."""
-    citation_ranges = {
-        "0": 0,
-        "1-5": 0,
-        "6-10": 0,
-        "11-20": 0,
-        "21-50": 0,
-        "51+": 0
-    }
+def process_page(items: List[Dict]) -> pd.DataFrame:
+    """Reduce one page of raw CrossRef items to the fields shown in the app.
+
+    The fields are collected into one list per column, so the page becomes a
+    DataFrame in a single construction instead of via a dict per article.
+    """
+    return pd.DataFrame({
+        "doi": np.array([article.get("DOI", "") for article in items], dtype=object),
+        "title": np.array([get_title(article) for article in items], dtype=object),
+        "citation_count": np.array([article.get("is-referenced-by-count", 0) for article in items], dtype="int64"),
+        "published_year": pd.array([get_published_year(article) for article in items], dtype="Int64")
+    })
+
+def throttled_progress(progress_bar, page_count: int):
+    """Return an ``update(done)`` callback that redraws the progress bar sparingly.
+
+    The bar is redrawn about 20 times per fetch at most, never twice within
+    PROGRESS_INTERVAL seconds, and always once the last page is in.
+    """
+    step = max(1, page_count // 20)
+    last_update = 0.0
+    
+    def update(done: int):
+        nonlocal last_update
+        now = time.monotonic()
+        if done >= page_count or (done % step == 0 and now - last_update >= PROGRESS_INTERVAL):
+            progress_bar.progress(min(done / page_count, 1.0))
+            last_update = now
+    
+    return update
+
+def iter_pages_by_cursor(issn: str, headers: dict, select: str, update_progress,
+                         force_refresh: bool = False) -> Iterator[List[Dict]]:
+    """Yield the works of a journal page by page, following CrossRef's deep-paging cursor."""
+    cursor = "*"
+    has_more = True
+    page_count = 0
     
-    for article in articles:
-        count = article["citation_count"]
-        if count == 0:
-            citation_ranges["0"] += 1
-        elif count <= 5:
-            citation_ranges["1-5"] += 1
-        elif count <= 10:
-            citation_ranges["6-10"] += 1
-        elif count <= 20:
-            citation_ranges["11-20"] += 1
-        elif count <= 50:
-            citation_ranges["21-50"] += 1
-        else:
-            citation_ranges["51+"] += 1
+    while has_more:
+        page_count += 1
+        
+        params = {
+            "filter": f"issn:{issn}",
+            "rows": str(ROWS_PER_PAGE),
+            "cursor": cursor,
+            "select": select
+        }
+        
+        data = get_works(params, headers, force_refresh)
+        items = data.get("items", [])
+        
+        cursor = data.get("next-cursor")
+        has_more = cursor and len(items) > 0
+        
+        update_progress(page_count)
+        yield items
+
+def iter_pages(issn: str, headers: dict, select: str, progress_bar, status_text,
+               force_refresh: bool = False) -> Iterator[List[Dict]]:
+    """Yield the raw works of a journal one page at a time, restricted to the ``select`` fields.
+
+    A first request with ``rows=0`` reads the number of works, after which
+    all pages are requested concurrently by offset. Journals beyond CrossRef's
+    offset limit fall back to sequential cursor paging. Offset pages are
+    sorted by creation date and yielded in offset order, so the result does
+    not depend on timing.
+    """
+    status_text.text("Counting articles...")
+    total = get_works({"filter": f"issn:{issn}", "rows": "0"}, headers, force_refresh).get("total-results", 0)
+    page_count = math.ceil(total / ROWS_PER_PAGE)
+    if not page_count:
+        return
+    
+    status_text.text(f"Fetching {total:,} articles in {page_count} pages...")
+    update_progress = throttled_progress(progress_bar, page_count)
+    
+    if total > MAX_OFFSET:
+        yield from iter_pages_by_cursor(issn, headers, select, update_progress, force_refresh)
+        return
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(get_works, {
+                "filter": f"issn:{issn}",
+                "rows": str(ROWS_PER_PAGE),
+                "offset": str(page * ROWS_PER_PAGE),
+                "select": select,
+                **OFFSET_SORT
+            }, headers, force_refresh)
+            for page in range(page_count)
+        ]
+        # Widgets are only touched from this thread; the workers just do HTTP
+        for done, future in enumerate(futures, 1):
+            items = future.result().get("items", [])
+            update_progress(done)
+            yield items
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def cached_articles(issn: str, email: str, _articles: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Day-long cache of fetched articles per ISSN and email.
+
+    Called without ``_articles`` it only looks up the cache and raises
+    LookupError on a miss, which Streamlit does not cache. Called with the
+    articles of a completed crawl it stores them. It never touches widgets,
+    so a cache hit has no element calls to replay.
+    """
+    if _articles is None:
+        raise LookupError(f"No cached articles for ISSN {issn}")
+    return _articles
+
+def fetch_all_articles(issn: str, email: str, progress_bar, status_text,
+                       force_refresh: bool = False) -> pd.DataFrame:
+    """Fetch all articles from a journal by ISSN.
+
+    Cached results are returned without touching CrossRef; otherwise the
+    journal is crawled with the progress widgets and the result cached.
+    ``force_refresh`` discards the cached entry and bypasses the HTTP cache.
+
+    Each page is reduced to a small DataFrame as soon as it arrives, so the
+    raw JSON of the whole journal is never held at once. Request errors are
+    raised rather than reported here so that an incomplete crawl is never cached.
+    """
+    if force_refresh:
+        cached_articles.clear(issn, email)
+    else:
+        try:
+            return cached_articles(issn, email)
+        except LookupError:
+            pass
+    
+    pages = iter_pages(issn, get_headers(email), SELECT_FIELDS, progress_bar, status_text, force_refresh)
+    frames = [process_page(items) for items in pages]
+    articles = pd.concat(frames, ignore_index=True) if frames else process_page([])
+    # A work that moved between two offset windows while they were fetched is only kept once
+    articles = articles.drop_duplicates("doi", ignore_index=True)
+    return cached_articles(issn, email, articles)
+
+def refresh_citations(issn: str, email: str, progress_bar, status_text) -> Dict[str, int]:
+    """Look up the current citation counts of all works of a journal.
+
+    Only the DOI and count are requested, which keeps the pages small, and
+    the HTTP cache is bypassed so the counts are current. Returns a mapping
+    of lower-cased DOI to citation count.
+    """
+    pages = iter_pages(issn, get_headers(email), "DOI,is-referenced-by-count", progress_bar, status_text,
+                       force_refresh=True)
+    return {
+        item.get("DOI", "").lower(): item.get("is-referenced-by-count", 0)
+        for items in pages
+        for item in items
+    }
+
+def create_citation_distribution_chart(df: pd.DataFrame) -> go.Figure:
+    """Create a bar chart for citation distribution."""
+    counts, _ = np.histogram(df['Citations'].to_numpy(), bins=CITATION_BINS)
     
     fig = go.Figure(data=[
         go.Bar(
-            x=list(citation_ranges.keys()),
-            y=list(citation_ranges.values()),
+            x=CITATION_LABELS,
+            y=counts,
             marker_color='#1f77b4'
         )
     ])
@@ -142,24 +287,20 @@ def create_citation_distribution_chart(articles: List[Dict]) -> go.Figure:
     
     return fig
 
-def create_year_chart(articles: List[Dict]) -> go.Figure:
+def create_year_chart(df: pd.DataFrame) -> go.Figure:
     """Create a chart showing publications and citations by year."""
-    articles_with_years = [a for a in articles if a["published_year"]]
+    year_stats = (
+        df.dropna(subset=['Year'])
+        .groupby('Year')
+        .agg(count=('DOI', 'size'), total_citations=('Citations', 'sum'))
+    )
     
-    if not articles_with_years:
+    if year_stats.empty:
         return None
     
-    year_stats = {}
-    for article in articles_with_years:
-        year = article["published_year"]
-        if year not in year_stats:
-            year_stats[year] = {"count": 0, "total_citations": 0}
-        year_stats[year]["count"] += 1
-        year_stats[year]["total_citations"] += article["citation_count"]
-    
-    years = sorted(year_stats.keys())
-    counts = [year_stats[y]["count"] for y in years]
-    citations = [year_stats[y]["total_citations"] for y in years]
+    years = year_stats.index.astype(int)
+    counts = year_stats['count']
+    citations = year_stats['total_citations']
     
     fig = go.Figure()
     
@@ -207,7 +348,21 @@ def main():
             help="Required to request data from CrossRef"
         )
 
-        fetch_button = st.button("🔍 Fetch Articles", type="primary")
+        force_refresh = st.checkbox(
+            "Force refresh",
+            help="Ignore cached results and fetch the articles from CrossRef again"
+        )
+
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            fetch_button = st.button("🔍 Fetch Articles", type="primary")
+        
+        with col2:
+            refresh_button = st.button(
+                "🔄 Refresh counts only",
+                help="Update the citation counts of the fetched articles without fetching the journal again"
+            )
     
     # Main content area
     if fetch_button:
@@ -219,28 +374,68 @@ def main():
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            articles = fetch_all_articles(issn, email, progress_bar, status_text)
-            
-            progress_bar.empty()
-            status_text.empty()
+            try:
+                articles = fetch_all_articles(issn, email, progress_bar, status_text, force_refresh)
+            except requests.exceptions.RequestException as e:
+                st.error(f"Error fetching articles from CrossRef: {e}")
+                return
+            except Exception as e:
+                st.error(f"Unexpected error while fetching articles: {e}")
+                return
+            finally:
+                progress_bar.empty()
+                status_text.empty()
         
-        if not articles:
+        if articles.empty:
             st.warning("No articles found for this ISSN. Please check the ISSN and try again.")
             return
         
         # Store in session state
-        st.session_state['articles'] = articles
+        st.session_state['articles_df'] = articles
         st.session_state['issn'] = issn
         fetched_info = True
     
+    elif refresh_button:
+        if 'articles_df' not in st.session_state:
+            st.info("Fetch the articles of a journal first, then refresh their citation counts.")
+            return
+        
+        articles = st.session_state['articles_df']
+        
+        with st.spinner("Refreshing citation counts from CrossRef..."):
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            
+            try:
+                counts = refresh_citations(st.session_state['issn'], email, progress_bar, status_text)
+            except requests.exceptions.RequestException as e:
+                st.error(f"Error refreshing citation counts: {e}")
+                return
+            finally:
+                progress_bar.empty()
+                status_text.empty()
+        
+        current_counts = articles['doi'].str.lower().map(counts)
+        st.session_state['articles_df'] = articles.assign(
+            citation_count=current_counts.fillna(articles['citation_count']).astype("int64")
+        )
+    
     # Display results if we have data
-    if 'articles' in st.session_state:
-        articles = st.session_state['articles']
+    if 'articles_df' in st.session_state:
+        articles = st.session_state['articles_df']
         issn = st.session_state['issn']
         
+        df = articles.rename(columns={
+            'doi': 'DOI',
+            'title': 'Title',
+            'citation_count': 'Citations',
+            'published_year': 'Year'
+        })
+        df = df.sort_values('Citations', ascending=False, kind='stable')
+        
         # Key metrics
-        total_articles = len(articles)
-        total_citations = sum(article["citation_count"] for article in articles)
+        total_articles = len(df)
+        total_citations = int(df['Citations'].sum())
         avg_citations = total_citations / total_articles if total_articles > 0 else 0
         
         col1, col2, col3 = st.columns(3)
@@ -260,11 +455,11 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = create_citation_distribution_chart(articles)
+            fig = create_citation_distribution_chart(df)
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
-            year_fig = create_year_chart(articles)
+            year_fig = create_year_chart(df)
             if year_fig:
                 st.plotly_chart(year_fig, use_container_width=True)
             else:
@@ -275,31 +470,31 @@ def main():
         # Top cited articles
         st.subheader("🏆 Top 10 Most Cited Articles")
         
-        top_cited = sorted(articles, key=lambda x: x["citation_count"], reverse=True)[:10]
+        top_cited = df.nlargest(10, 'Citations').to_dict('records')
         
         for i, article in enumerate(top_cited, 1):
-            with st.expander(f"#{i} - {article['title'][:80]}{'...' if len(article['title']) > 80 else ''}"):
-                st.markdown(f"**Citations:** {article['citation_count']}")
-                st.markdown(f"**DOI:** [{article['doi']}](https://doi.org/{article['doi']})")
-                if article['published_year']:
-                    st.markdown(f"**Year:** {article['published_year']}")
+            with st.expander(f"#{i} - {article['Title'][:80]}{'...' if len(article['Title']) > 80 else ''}"):
+                st.markdown(f"**Citations:** {article['Citations']}")
+                st.markdown(f"**DOI:** [{article['DOI']}](https://doi.org/{article['DOI']})")
+                if pd.notna(article['Year']):
+                    st.markdown(f"**Year:** {int(article['Year'])}")
         
         st.markdown("---")
         
         # Full data table
         st.subheader("📊 All Articles")
         
-        df = pd.DataFrame(articles)
-        df = df.rename(columns={
-            'doi': 'DOI',
-            'title': 'Title',
-            'citation_count': 'Citations',
-            'published_year': 'Year'
-        })
-        df = df.sort_values('Citations', ascending=False)
+        # Only one page of the table is serialized to the browser per rerun
+        table_df = df
+        if len(df) > TABLE_PAGE_SIZE:
+            page_total = math.ceil(len(df) / TABLE_PAGE_SIZE)
+            page = st.number_input("Page", min_value=1, max_value=page_total, value=1, step=1)
+            start = (page - 1) * TABLE_PAGE_SIZE
+            table_df = df.iloc[start:start + TABLE_PAGE_SIZE]
+            st.caption(f"Showing articles {start + 1:,}-{start + len(table_df):,} of {len(df):,}")
         
         st.dataframe(
-            df,
+            table_df,
             use_container_width=True,
             height=400,
             column_config={
@@ -333,7 +528,8 @@ def main():
         
         with col2:
             # JSON export
-            json_data = json.dumps(articles, indent=2, ensure_ascii=False)
+            records = articles.astype(object).where(articles.notna(), None).to_dict('records')
+            json_data = json.dumps(records, indent=2, ensure_ascii=False)
             
             st.download_button(
                 label="📋 Download JSON",
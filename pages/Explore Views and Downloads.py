@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
 
-#function that counts the top 5 downloads
-def article_top5_downloads(df, button):
-    if button == 'File Downloads':
-        view_type = 'PDF'
-    elif button == 'Abstract views':
-        view_type = 'Abstract Views'
-    return df.sort_values(by=view_type, ascending=False, na_position='last').head(5)
+#the report column behind each choice of the ranking radio button
+VIEW_TYPES = {'File Downloads': 'PDF', 'Abstract views': 'Abstract Views'}
+
+#function that counts the top 5 articles and their max/min/mean for every ranking at once,
+#cached per uploaded report so switching the ranking is a dict lookup
+@st.cache_data(show_spinner=False)
+def article_top5_downloads(df_path):
+    df = pd.read_parquet(df_path, memory_map=True)
+    top5 = {}
+    for button, view_type in VIEW_TYPES.items():
+        top5_df = df.nlargest(5, view_type)
+        top5[button] = (top5_df, top5_df[view_type].agg(['max', 'min', 'mean']).to_dict())
+    return top5
 
 st.title('Views and Downloads')
 st.markdown("""
@@ -39,8 +45,6 @@ with st.expander("📖 Understanding These Metrics", expanded=False):
 
 #check if the df was uploaded
 if 'df_valid' in st.session_state and st.session_state.df_valid is not False:
-    df = st.session_state.df
-    
     st.header('Top 5 Articles by Engagement')
     
     # Add context about the ranking
@@ -52,7 +56,7 @@ if 'df_valid' in st.session_state and st.session_state.df_valid is not False:
     Both metrics are filtered using COUNTER standards to remove bot traffic and provide accurate readership data.
     """)
     
-    view_type = st.radio("Pick one", ["File Downloads", "Abstract views"])
+    view_type = st.radio("Pick one", list(VIEW_TYPES))
     
     # Add interpretation based on selected metric
     if view_type == "File Downloads":
@@ -60,7 +64,7 @@ if 'df_valid' in st.session_state and st.session_state.df_valid is not False:
     else:
         st.info("👀 **Abstract Views** - These articles are attracting the most initial interest. They have strong titles, good SEO, or are being widely browsed.")
     
-    top5_df = article_top5_downloads(df, view_type)
+    top5_df, stats = article_top5_downloads(st.session_state.df_path)[view_type]
     st.write(top5_df)
     
     # Add insights section
@@ -68,9 +72,7 @@ if 'df_valid' in st.session_state and st.session_state.df_valid is not False:
         st.subheader("📊 Quick Insights")
         
         if view_type == "File Downloads":
-            max_downloads = top5_df['PDF'].max()
-            min_downloads = top5_df['PDF'].min()
-            avg_downloads = top5_df['PDF'].mean()
+            max_downloads, min_downloads, avg_downloads = stats['max'], stats['min'], stats['mean']
             
             col1, col2, col3 = st.columns(3)
             with col1:
@@ -88,9 +90,7 @@ if 'df_valid' in st.session_state and st.session_state.df_valid is not False:
             """)
         
         else:  # Abstract views
-            max_views = top5_df['Abstract Views'].max()
-            min_views = top5_df['Abstract Views'].min()
-            avg_views = top5_df['Abstract Views'].mean()
+            max_views, min_views, avg_views = stats['max'], stats['min'], stats['mean']
             
             col1, col2, col3 = st.columns(3)
             with col1:
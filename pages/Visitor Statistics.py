@@ -1,17 +1,49 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+from bisect import bisect_left
+
+#the visitor sums per country of the uploaded report, shared between reruns and sessions
+#without copying them, so callers must not modify the returned frame
+@st.cache_resource(show_spinner=False)
+def load_geo_report(geodf_path):
+    return pd.read_parquet(geodf_path, memory_map=True)
+
+#the aggregates below are cached per uploaded report, so changing the selected country does not recompute them
+@st.cache_data(show_spinner=False)
+def country_totals(geodf_path):
+    #unique visitors per country, the one groupby the country statistics below are derived from
+    df = load_geo_report(geodf_path)
+    return df.groupby('Country', observed=True, sort=False)['Unique'].sum()
+
+@st.cache_data(show_spinner=False)
+def geo_overview(geodf_path):
+    return country_totals(geodf_path).nlargest(10).reset_index()
+
+@st.cache_data(show_spinner=False)
+def total_visitor_count(geodf_path):
+    df = load_geo_report(geodf_path)
+    return int(df['Total'].sum())
+
+@st.cache_data(show_spinner=False)
+def top_countries_table(geodf_path):
+    #top 10 countries with their share of all visitors and their rank
+    top_countries = geo_overview(geodf_path)
+    total_unique = total_visitor_count(geodf_path)
+    return top_countries.assign(
+        Percentage=top_countries['Unique'] * 100 / total_unique,
+        Rank=np.arange(1, len(top_countries) + 1, dtype='int32')
+    )
 
-def geo_overview(df):
-    result = df.groupby('Country')['Unique'].sum().reset_index()
-    sorted_result = result.sort_values(by='Unique', ascending=False, na_position='last')
-    return sorted_result.head(10)
-
-def total_visitor_count(df):
-    return sum(df['Total'])
+@st.cache_data(show_spinner=False)
+def country_list(geodf_path):
+    #sorted names of all countries in the report, without missing values;
+    #the upload page stores Country as a categorical, whose categories are sorted
+    return load_geo_report(geodf_path)['Country'].cat.categories.tolist()
 
-def filter_visitors(df, country):
-    filtered_df = df[df['Country'] == country]
-    return sum(filtered_df['Unique'])
+def filter_visitors(totals, country):
+    #countries without any recorded visitors are not in the grouped totals
+    return int(totals.get(country, 0))
 
 st.title('Visitor Statistics')
 
@@ -24,10 +56,11 @@ accurate geographic readership data.
 """)
 
 #check if the df was uploaded
-if 'geodf' in st.session_state and st.session_state.get("geodf_valid", True):
-    geo_df = st.session_state.geodf
-
-    total_unique = total_visitor_count(geo_df)
+if 'geodf_path' in st.session_state and st.session_state.get("geodf_valid", True):
+    total_unique = total_visitor_count(st.session_state.geodf_path)
+    top_countries = top_countries_table(st.session_state.geodf_path)
+    # 1-based rank of each of the top 10 countries
+    rank_map = dict(zip(top_countries['Country'], top_countries['Rank']))
 
     st.subheader('📊 Total Unique Visitors')
     
@@ -61,16 +94,20 @@ if 'geodf' in st.session_state and st.session_state.get("geodf_valid", True):
     - Time zone considerations for announcements or events
     """)
 
-    unique_countries = list(set(geo_df['Country']))
-    unique_countries = sorted(unique_countries)
+    unique_countries = country_list(st.session_state.geodf_path)
+
+    # default is the Netherlands if available, found by binary search in the sorted list
+    default_index = bisect_left(unique_countries, 'Netherlands')
+    if default_index == len(unique_countries) or unique_countries[default_index] != 'Netherlands':
+        default_index = 0
 
     option = st.selectbox(
         "Select a country to see detailed statistics:",
         unique_countries,
-        index=92 if len(unique_countries) > 92 else 0  # default is the Netherlands if available
+        index=default_index
     )
 
-    number = filter_visitors(geo_df, option)
+    number = filter_visitors(country_totals(st.session_state.geodf_path), option)
     percentage = round((number/total_unique)*100, 2)
 
     # Display country-specific data with better formatting
@@ -81,11 +118,8 @@ if 'geodf' in st.session_state and st.session_state.get("geodf_valid", True):
         st.metric("Percentage of Total", f"{percentage}%")
     with col3:
         if total_unique > 0:
-            rank_df = geo_overview(geo_df)
-            if option in rank_df['Country'].values:
-                # Find the position in the sorted list (1-based ranking)
-                country_rank = rank_df.reset_index(drop=True)
-                country_rank = country_rank[country_rank['Country'] == option].index[0] + 1
+            country_rank = rank_map.get(option)
+            if country_rank is not None:
                 st.metric("Country Rank", f"#{country_rank}")
             else:
                 st.metric("Country Rank", "Not in Top 10")
@@ -106,17 +140,17 @@ if 'geodf' in st.session_state and st.session_state.get("geodf_valid", True):
     - **Partnership opportunities**: Academic institutions in high-readership countries
     """)
     
-    top_countries = geo_overview(geo_df)
-    
-    # Enhanced display with percentages
-    top_countries['Percentage'] = round((top_countries['Unique'] / total_unique) * 100, 2)
-    top_countries['Rank'] = range(1, len(top_countries) + 1)
-    
     # Reorder columns for better display
-    display_df = top_countries[['Rank', 'Country', 'Unique', 'Percentage']].copy()
-    display_df.columns = ['Rank', 'Country', 'Unique Visitors', 'Percentage of Total (%)']
+    display_df = top_countries.rename(
+        columns={'Unique': 'Unique Visitors', 'Percentage': 'Percentage of Total (%)'}
+    )[['Rank', 'Country', 'Unique Visitors', 'Percentage of Total (%)']]
     
-    st.dataframe(display_df, hide_index=True)
+    #the percentages are rounded by the table itself
+    st.dataframe(
+        display_df,
+        hide_index=True,
+        column_config={'Percentage of Total (%)': st.column_config.NumberColumn(format='%.2f')}
+    )
     
     # Add insights section
     st.subheader("📈 Geographic Insights")
@@ -130,7 +164,7 @@ if 'geodf' in st.session_state and st.session_state.get("geodf_valid", True):
         with col1:
             st.markdown(f"""
             **Concentration Analysis:**
-            - **{top_country['Country']}** is your largest audience ({top_country['Percentage']}%)
+            - **{top_country['Country']}** is your largest audience ({top_country['Percentage']:.2f}%)
             - Your **top 3 countries** represent **{top_3_percentage}%** of all visitors
             - You have readers from **{len(unique_countries)}** different countries
             """)